@@ -8,7 +8,11 @@ class Config:
     frame_height: int = 480
 
     # YOLO
-    yolo_model_path: str = "weights/best.pt"
+    yolo_model_path: str = "weights/best.pt"  # .pt, or an exported model (e.g. weights/best_openvino_model/)
+    yolo_device: str | None = None  # None = auto; "cuda", "mps", "cpu", "0", ...
+    yolo_half: bool = False  # FP16 inference (CUDA / exported FP16 models)
+    yolo_prefer_exported: bool = True  # use best.engine / best_openvino_model / best.onnx if exported
+    infer_size: int = 640  # frames larger than this (longest side) are downscaled before YOLO
     conf_threshold: float = 0.60
     iou_threshold: float = 0.45
     min_box_area: int = 24 * 24 
@@ -16,6 +20,10 @@ class Config:
     # Detection stability
     confirm_frames: int = 3  # N consecutive frames required to stabilise detection decision
 
+    # Static-scene skip: reuse the last detections while the frame barely changes
+    motion_skip_threshold: float = 2.0  # mean abs diff (0-255) of a 64x36 grey thumbnail
+    motion_refresh_frames: int = 15  # always re-run YOLO after this many skipped frames
+
  
     # GPS
     gps_port: str = "/dev/serial0"
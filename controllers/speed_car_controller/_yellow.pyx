@@ -0,0 +1,30 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Yellow road-line scan for speed_car_controller, for Webots Pythons that
+ship without NumPy. Build next to the controller with:
+
+    CFLAGS="-O3 -march=native" cythonize -i _yellow.pyx
+"""
+
+
+def scan(const unsigned char[::1] img, int w, int h,
+         int ref_b, int ref_g, int ref_r, int tol):
+    """Return (sumx, count) over BGRA pixels within L1 distance `tol`."""
+    cdef Py_ssize_t x, y
+    cdef Py_ssize_t idx = 0
+    cdef long long sumx = 0
+    cdef long long count = 0
+    cdef int b, g, r
+
+    with nogil:
+        for y in range(h):
+            for x in range(w):
+                b = img[idx]
+                g = img[idx + 1]
+                r = img[idx + 2]
+                if abs(b - ref_b) + abs(g - ref_g) + abs(r - ref_r) < tol:
+                    sumx += x
+                    count += 1
+                idx += 4
+
+    return sumx, count
@@ -1,19 +1,47 @@
 
 
+import logging
+import os
 import socket
-import json
+import sys
+import select
 import threading
 import time
 import math
+import zlib
+from collections import deque
+
+# NumPy / OpenCV / the Cython kernel are all optional inside the Webots
+# Python; the yellow scan uses the fastest one available
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+try:
+    from _yellow import scan as _yellow_scan   # build: see _yellow.pyx
+except ImportError:
+    _yellow_scan = None
 
 from vehicle import Driver
 
+log = logging.getLogger("speed_car_controller")
+
 
 # TUNEABLE PARAMETERS
 
 HOST = "127.0.0.1"
 PORT = 65432
 
+# Gather-write queued frames in one syscall where the platform allows it
+SEND_FLAGS  = getattr(socket, "MSG_NOSIGNAL", 0)
+HAS_SENDMSG = hasattr(socket.socket, "sendmsg")
+
 # Initial cruising speed in km/h (~31 mph)
 INITIAL_SPEED_KPH = 50.0
 
@@ -34,12 +62,70 @@ YELLOW_REF_G = 187
 YELLOW_REF_R = 203
 YELLOW_TOLERANCE = 30
 
+# Use the OpenCV uint8 pipeline for the yellow scan when cv2 is available
+YELLOW_USE_OPENCV = True
+
 UNKNOWN = 99999.99   # sentinel, 
 
+# Only push actuator changes to Webots beyond these deltas
+SPEED_EPSILON_KPH   = 0.1
+STEER_EPSILON_RAD   = 0.001
+
+# Telemetry line sent to main_webots.py (newline-delimited JSON)
+PAYLOAD_FMT = (b'{"speed_mps":%.3f,"speed_mph":%.1f,"speed_kph":%.1f,'
+               b'"pos_x":%.2f,"pos_z":%.2f,"ts":%.3f}\n')
+
 
 # PID CONTROLLER  ( applyPID)
 
 
+# One PID step on plain floats -> (steer, old_value, integral).
+# KP/KI/KD are fixed at runtime, so they are baked in as literals when the
+# kernel is compiled below (LOAD_CONST instead of three LOAD_GLOBALs).
+_PID_STEP_SRC = """
+def _pid_step(angle, old_value, integral):
+    # Anti-windup: clear integral on sign flip
+    if copysign(1, angle) != copysign(1, old_value):
+        integral = 0.0
+
+    diff = angle - old_value
+
+    if -30 < integral < 30:
+        integral += angle
+
+    return {kp!r} * angle + {ki!r} * integral + {kd!r} * diff, angle, integral
+"""
+
+
+def _compile_pid_step():
+    namespace = {"copysign": math.copysign}
+    exec(_PID_STEP_SRC.format(kp=KP, ki=KI, kd=KD), namespace)
+    return namespace["_pid_step"]
+
+
+_pid_step = _compile_pid_step()
+
+
+def _mix_obstacle_steer(steer: float, obs_angle: float, obs_dist: float,
+                        line_steer):
+    """Avoidance steer around an obstacle, blended with the line steer."""
+    avoid_steer = steer
+    if 0.0 < obs_angle < 0.4:
+        avoid_steer = steer + (obs_angle - 0.25) / obs_dist
+    elif obs_angle > -0.4:
+        avoid_steer = steer + (obs_angle + 0.25) / obs_dist
+
+    if line_steer is None:
+        return avoid_steer
+
+    # Take the more extreme steer (most cautious)
+    if avoid_steer > 0 and line_steer > 0:
+        return max(avoid_steer, line_steer)
+    if avoid_steer < 0 and line_steer < 0:
+        return min(avoid_steer, line_steer)
+    return avoid_steer
+
+
 class LaneFollowPID:
     def __init__(self):
         self.old_value  = 0.0
@@ -55,17 +141,9 @@ class LaneFollowPID:
             self.integral   = 0.0
             self.need_reset = False
 
-        # Anti-windup: clear integral on sign flip
-        if math.copysign(1, angle) != math.copysign(1, self.old_value):
-            self.integral = 0.0
-
-        diff = angle - self.old_value
-
-        if -30 < self.integral < 30:
-            self.integral += angle
-
-        self.old_value = angle
-        return KP * angle + KI * self.integral + KD * diff
+        steer, self.old_value, self.integral = _pid_step(
+            angle, self.old_value, self.integral)
+        return steer
 
 
 
@@ -74,20 +152,24 @@ class LaneFollowPID:
 
 class AngleFilter:
     def __init__(self):
-        self.values     = [0.0] * FILTER_SIZE
+        self.values     = deque([0.0] * FILTER_SIZE, maxlen=FILTER_SIZE)
+        self.total      = 0.0   # running sum of self.values
         self.first_call = True
 
     def update(self, new_value: float) -> float:
         if self.first_call or new_value == UNKNOWN:
             self.first_call = False
-            self.values     = [0.0] * FILTER_SIZE
+            self.values     = deque([0.0] * FILTER_SIZE, maxlen=FILTER_SIZE)
+            self.total      = 0.0
         else:
-            self.values = self.values[1:] + [new_value]
+            evicted = self.values[0]
+            self.values.append(new_value)
+            self.total += new_value - evicted
 
         if new_value == UNKNOWN:
             return UNKNOWN
 
-        return sum(self.values) / FILTER_SIZE
+        return self.total / FILTER_SIZE
 
 
 
@@ -131,6 +213,27 @@ class SpeedCarController:
             print(f"[Controller] Camera {self.cam_w}x{self.cam_h} "
                   f"fov={self.cam_fov:.2f}")
 
+        # Per-frame constants for the vectorised yellow scan
+        if np is not None:
+            self._yellow_ref = np.array([YELLOW_REF_B, YELLOW_REF_G, YELLOW_REF_R],
+                                        dtype=np.int16)
+            self._col_idx    = np.arange(self.cam_w, dtype=np.int64)
+            # Scratch buffers reused by every scan (no per-frame allocation)
+            self._diff       = np.empty((self.cam_h, self.cam_w, 3), dtype=np.int16)
+            self._dist       = np.empty((self.cam_h, self.cam_w), dtype=np.int16)
+            self._mask       = np.empty((self.cam_h, self.cam_w), dtype=bool)
+            self._col_counts = np.empty(self.cam_w, dtype=np.int64)
+            # OpenCV path: reference colour as a full BGRA frame, and a
+            # weights row that sums |dB| + |dG| + |dR| into one channel
+            self._yellow_ref_img = np.empty((self.cam_h, self.cam_w, 4), dtype=np.uint8)
+            self._yellow_ref_img[:] = (YELLOW_REF_B, YELLOW_REF_G, YELLOW_REF_R, 0)
+            self._l1_weights = np.array([[1.0, 1.0, 1.0, 0.0]], dtype=np.float32)
+        self._use_opencv = YELLOW_USE_OPENCV and cv2 is not None and np is not None
+
+        # One-entry memo: skip the scan when the frame is byte-identical
+        self._last_cam_digest = None
+        self._last_cam_angle  = UNKNOWN
+
         #SICK LiDAR
         self.sick      = None
         self.sick_w    = 0
@@ -142,6 +245,12 @@ class SpeedCarController:
             self.sick_fov = self.sick.getFov()
             print(f"[Controller] SICK {self.sick_w}px fov={self.sick_fov:.2f}")
 
+        # Central window of the scan used for obstacle detection
+        self._sick_lo  = self.sick_w // 2 - SICK_HALF_AREA
+        self._sick_hi  = self.sick_w // 2 + SICK_HALF_AREA
+        if np is not None:
+            self._sick_idx = np.arange(self._sick_lo, self._sick_hi, dtype=np.float64)
+
         #GPS
         self.gps           = None
         self.gps_coords    = [0.0, 0.0, 0.0]
@@ -161,6 +270,10 @@ class SpeedCarController:
         self.steering_angle = 0.0
         self.manual_steer   = 0   # integer steps, 
 
+        # Last values actually sent to the driver (None = nothing sent yet)
+        self._last_sent_speed = None
+        self._last_sent_steer = None
+
         self.pid    = LaneFollowPID()
         self.filter = AngleFilter()
 
@@ -174,7 +287,7 @@ class SpeedCarController:
         self.driver.setWiperMode(Driver.SLOW)
 
         # Socket server 
-        self.clients      = []
+        self.clients      = []   # (conn, pending frames) pairs
         self.clients_lock = threading.Lock()
         self._start_socket_server()
 
@@ -192,8 +305,12 @@ class SpeedCarController:
     def _set_speed(self, kph: float):
         kph = min(kph, 250.0)
         self.speed_kph = kph
+        last = self._last_sent_speed
+        if last is not None and abs(kph - last) <= SPEED_EPSILON_KPH:
+            return
+        self._last_sent_speed = kph
         self.driver.setCruisingSpeed(kph)
-        print(f"[Controller] Speed → {kph:.0f} km/h ({kph/1.609:.0f} mph)")
+        log.info("[Controller] Speed → %.0f km/h (%.0f mph)", kph, kph / 1.609)
 
     def _set_steering_angle(self, angle: float):
         # Rate-limit: max 0.1 rad change per step 
@@ -201,7 +318,13 @@ class SpeedCarController:
         if delta >  0.1: angle = self.steering_angle + 0.1
         if delta < -0.1: angle = self.steering_angle - 0.1
         self.steering_angle = angle
-        self.driver.setSteeringAngle(max(-0.5, min(0.5, angle)))
+
+        steer = max(-0.5, min(0.5, angle))
+        last  = self._last_sent_steer
+        if last is not None and abs(steer - last) <= STEER_EPSILON_RAD:
+            return
+        self._last_sent_steer = steer
+        self.driver.setSteeringAngle(steer)
 
     
     # KEYBOARD  ( check_keyboard)
@@ -222,12 +345,14 @@ class SpeedCarController:
         elif key == ord('A'):
             if self.has_camera:
                 self.autodrive = True
+                self._last_cam_digest = None
                 print("[Controller] Auto-drive ON")
             else:
                 print("[Controller] Cannot enable auto-drive — no camera")
 
     def _change_manual_steer(self, inc: int):
         self.autodrive = False
+        self._last_cam_digest = None
         new_steer = self.manual_steer + inc
         if -25 <= new_steer <= 25:
             self.manual_steer = new_steer
@@ -242,25 +367,79 @@ class SpeedCarController:
         if not image:
             return UNKNOWN
 
-        num_pixels = self.cam_w * self.cam_h
-        sumx  = 0
-        count = 0
-
-        # Webots camera image is BGRA, 4 bytes per pixel
-        for px in range(num_pixels):
-            base = px * 4
-            b = image[base]
-            g = image[base + 1]
-            r = image[base + 2]
-            diff = abs(b - YELLOW_REF_B) + abs(g - YELLOW_REF_G) + abs(r - YELLOW_REF_R)
-            if diff < YELLOW_TOLERANCE:
-                sumx  += px % self.cam_w
-                count += 1
+        # Paused world / stopped car: the camera returns the same bytes
+        digest = zlib.crc32(image)
+        if digest == self._last_cam_digest:
+            return self._last_cam_angle
+        self._last_cam_digest = digest
+        self._last_cam_angle  = angle = self._scan_yellow(image)
+        return angle
+
+    def _scan_yellow(self, image) -> float:
+        cam_w, cam_fov = self.cam_w, self.cam_fov
+
+        if self._use_opencv:
+            return self._scan_yellow_cv(image)
+
+        if _yellow_scan is not None:
+            sumx, count = _yellow_scan(image, cam_w, self.cam_h, YELLOW_REF_B,
+                                       YELLOW_REF_G, YELLOW_REF_R, YELLOW_TOLERANCE)
+        elif np is not None:
+            sumx, count = self._scan_yellow_np(image)
+        else:
+            sumx, count = self._scan_yellow_py(image)
 
         if count == 0:
             return UNKNOWN
 
-        return ((sumx / count / self.cam_w) - 0.5) * self.cam_fov
+        return ((sumx / count / cam_w) - 0.5) * cam_fov
+
+    def _scan_yellow_cv(self, image) -> float:
+        # Webots camera image is BGRA, 4 bytes per pixel
+        buf = np.frombuffer(image, dtype=np.uint8).reshape(self.cam_h, self.cam_w, 4)
+
+        # Stays in 1-byte lanes; the saturating sum is safe because
+        # anything >= 255 is far outside the tolerance anyway
+        diff = cv2.transform(cv2.absdiff(buf, self._yellow_ref_img),
+                             self._l1_weights)
+        _, mask = cv2.threshold(diff, YELLOW_TOLERANCE - 1, 255,
+                                cv2.THRESH_BINARY_INV)
+        m = cv2.moments(mask, binaryImage=True)
+        if m["m00"] == 0:
+            return UNKNOWN
+        return ((m["m10"] / m["m00"] / self.cam_w) - 0.5) * self.cam_fov
+
+    def _scan_yellow_np(self, image):
+        # getImage() returns bytes, so frombuffer is a zero-copy view
+        buf  = np.frombuffer(image, dtype=np.uint8).reshape(self.cam_h, self.cam_w, 4)
+        diff, dist, mask = self._diff, self._dist, self._mask
+
+        np.subtract(buf[:, :, :3], self._yellow_ref, out=diff)
+        np.abs(diff, out=diff)
+        diff.sum(axis=2, dtype=np.int16, out=dist)
+        np.less(dist, YELLOW_TOLERANCE, out=mask)
+
+        count = int(np.count_nonzero(mask))
+        mask.sum(axis=0, dtype=np.int64, out=self._col_counts)
+        sumx  = int(self._col_counts @ self._col_idx)
+        return sumx, count
+
+    def _scan_yellow_py(self, image):
+        sumx  = 0
+        count = 0
+        base  = 0
+
+        # Row/column loops so the column index needs no per-pixel modulo
+        for _ in range(self.cam_h):
+            for x in range(self.cam_w):
+                diff = (abs(image[base] - YELLOW_REF_B)
+                        + abs(image[base + 1] - YELLOW_REF_G)
+                        + abs(image[base + 2] - YELLOW_REF_R))
+                if diff < YELLOW_TOLERANCE:
+                    sumx  += x
+                    count += 1
+                base += 4
+        return sumx, count
 
    
     # SICK — obstacle angle & distance 
@@ -271,17 +450,23 @@ class SpeedCarController:
         if not data:
             return UNKNOWN, 0.0
 
-        mid   = self.sick_w // 2
-        sumx  = 0
-        count = 0
-        total = 0.0
+        if np is not None:
+            seg  = np.asarray(data[self._sick_lo:self._sick_hi], dtype=np.float64)
+            near = seg < 20.0
 
-        for x in range(mid - SICK_HALF_AREA, mid + SICK_HALF_AREA):
-            r = data[x]
-            if r < 20.0:
-                sumx  += x
-                count += 1
-                total += r
+            count = int(near.sum())
+            sumx  = float(self._sick_idx[near].sum())
+            total = float(seg[near].sum())
+        else:
+            sumx  = 0
+            count = 0
+            total = 0.0
+            for x in range(self._sick_lo, self._sick_hi):
+                r = data[x]
+                if r < 20.0:
+                    sumx  += x
+                    count += 1
+                    total += r
 
         if count == 0:
             return UNKNOWN, 0.0
@@ -295,8 +480,13 @@ class SpeedCarController:
    
 
     def _update_gps(self):
-        self.gps_coords    = list(self.gps.getValues())
-        self.gps_speed_kph = self.gps.getSpeed() * 3.6   # m/s → km/h
+        coords = list(self.gps.getValues())
+        speed  = self.gps.getSpeed()
+        # GPS reads NaN until its first update; PAYLOAD_FMT would emit "nan"
+        if math.isnan(speed) or any(math.isnan(c) for c in coords):
+            return
+        self.gps_coords    = coords
+        self.gps_speed_kph = speed * 3.6   # m/s → km/h
 
    
     # AUTO-DRIVE DECISION  ( main loop obstacle/line logic)
@@ -308,25 +498,15 @@ class SpeedCarController:
         if self.has_sick and obs_angle != UNKNOWN:
             # Obstacle present, compute avoidance steer 
             self.driver.setBrakeIntensity(0.0)
-            avoid_steer = self.steering_angle
-
-            if 0.0 < obs_angle < 0.4:
-                avoid_steer = self.steering_angle + (obs_angle - 0.25) / obs_dist
-            elif obs_angle > -0.4:
-                avoid_steer = self.steering_angle + (obs_angle + 0.25) / obs_dist
 
-            steer = avoid_steer
+            line_steer = None
             if yellow_angle != UNKNOWN:
                 line_steer = self.pid.update(yellow_angle)
-                # Take the more extreme steer (most cautious)
-                if avoid_steer > 0 and line_steer > 0:
-                    steer = max(avoid_steer, line_steer)
-                elif avoid_steer < 0 and line_steer < 0:
-                    steer = min(avoid_steer, line_steer)
             else:
                 self.pid.reset()
 
-            self._set_steering_angle(steer)
+            self._set_steering_angle(_mix_obstacle_steer(
+                self.steering_angle, obs_angle, obs_dist, line_steer))
 
         elif yellow_angle != UNKNOWN:
             #  No obstacle? follow yellow line 
@@ -343,50 +523,83 @@ class SpeedCarController:
    
 
     def _start_socket_server(self):
+        # A byte written to _shutdown_w wakes the accept thread so it can exit
+        self._shutdown_r, self._shutdown_w = socket.socketpair()
+
         def serve():
             srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             srv.bind((HOST, PORT))
             srv.listen(5)
-            srv.settimeout(1.0)
             print(f"[Socket] Listening on {HOST}:{PORT}")
             while True:
+                # Sleep in the kernel until a client or shutdown arrives
+                readable, _, _ = select.select([srv, self._shutdown_r], [], [])
+                if self._shutdown_r in readable:
+                    break
                 try:
                     conn, addr = srv.accept()
+                    # Small frames at 10 Hz: send immediately, never block
+                    # the control loop on a slow reader
+                    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 64 * 1024)
+                    conn.setblocking(False)
                     with self.clients_lock:
-                        self.clients.append(conn)
+                        self.clients.append((conn, deque()))
                     print(f"[Socket] Client connected: {addr}")
-                except socket.timeout:
-                    pass
                 except Exception as e:
                     print(f"[Socket] Error: {e}")
                     break
+            srv.close()
 
         threading.Thread(target=serve, daemon=True).start()
 
+    def _stop_socket_server(self):
+        try:
+            self._shutdown_w.send(b"\0")
+        except OSError:
+            pass
+
     def _broadcast(self):
         speed_mps = self.gps_speed_kph / 3.6
         x = self.gps_coords[0] if self.gps_coords else 0.0
         z = self.gps_coords[2] if len(self.gps_coords) > 2 else 0.0
 
-        payload = json.dumps({
-            "speed_mps": round(speed_mps, 3),
-            "speed_mph": round(speed_mps * 2.237, 1),
-            "speed_kph": round(self.gps_speed_kph, 1),
-            "pos_x":     round(x, 2),
-            "pos_z":     round(z, 2),
-            "ts":        time.time()
-        }) + "\n"
+        payload = PAYLOAD_FMT % (speed_mps, speed_mps * 2.237,
+                                 self.gps_speed_kph, x, z, time.time())
 
-        dead = []
         with self.clients_lock:
-            for conn in self.clients:
+            alive = []
+            for client in self.clients:
+                conn, pending = client
+                pending.append(payload)
                 try:
-                    conn.sendall(payload.encode())
+                    self._flush(conn, pending)
+                    alive.append(client)
+                    continue
+                except BlockingIOError:
+                    # Send buffer full — client has stopped reading
+                    print("[Socket] Dropping stale client")
                 except Exception:
-                    dead.append(conn)
-            for d in dead:
-                self.clients.remove(d)
+                    pass
+                try:
+                    conn.close()
+                except OSError:
+                    pass
+            self.clients = alive
+
+    @staticmethod
+    def _flush(conn, pending: deque):
+        if HAS_SENDMSG:
+            sent = conn.sendmsg(pending, (), SEND_FLAGS)
+        else:
+            sent = conn.send(b"".join(pending))
+
+        # Drop fully written frames; keep the unsent tail of a partial one
+        while pending and sent >= len(pending[0]):
+            sent -= len(pending.popleft())
+        if sent:
+            pending[0] = pending[0][sent:]
 
    
     # MAIN LOOP
@@ -395,43 +608,63 @@ class SpeedCarController:
     def run(self):
         # Run sensors every 50 ms
         SENSOR_EVERY_N    = max(1, int(50 / self.timestep))
-        BROADCAST_INTERVAL = 0.1   # 10 Hz
-        broadcast_timer   = 0.0
-        step_count        = 0
-
-        while self.driver.step() != -1:
+        # Broadcast every 100 ms (10 Hz), counted in whole timesteps
+        BROADCAST_EVERY_N = max(1, math.ceil(100 / self.timestep))
+        sensor_ticks_left    = 0
+        broadcast_ticks_left = BROADCAST_EVERY_N
+
+        # Bind hot lookups to locals (LOAD_FAST instead of LOAD_ATTR)
+        _step    = self.driver.step
+        _kbd     = self._handle_keyboard
+        _bcast   = self._broadcast
+        _camera  = self._process_camera
+        _sick    = self._process_sick
+        _gps     = self._update_gps
+        _filter  = self.filter.update
+        _drive   = self._run_autodrive
+        has_camera = self.has_camera
+        has_sick   = self.has_sick
+        has_gps    = self.has_gps
+
+        while _step() != -1:
 
             # Keyboard every step
-            self._handle_keyboard()
+            _kbd()
 
             # Sensors every 50 ms
-            if step_count % SENSOR_EVERY_N == 0:
+            if sensor_ticks_left == 0:
+                sensor_ticks_left = SENSOR_EVERY_N - 1
 
                 yellow_angle = UNKNOWN
                 obs_angle    = UNKNOWN
                 obs_dist     = 0.0
 
-                if self.has_camera:
-                    yellow_angle = self.filter.update(self._process_camera())
+                if has_camera:
+                    yellow_angle = _filter(_camera())
 
-                if self.has_sick:
-                    obs_angle, obs_dist = self._process_sick()
+                if has_sick:
+                    obs_angle, obs_dist = _sick()
 
-                if self.autodrive and self.has_camera:
-                    self._run_autodrive(yellow_angle, obs_angle, obs_dist)
+                if self.autodrive and has_camera:
+                    _drive(yellow_angle, obs_angle, obs_dist)
 
-                if self.has_gps:
-                    self._update_gps()
+                if has_gps:
+                    _gps()
+            else:
+                sensor_ticks_left -= 1
 
             # Broadcast speed at 10 Hz
-            broadcast_timer += self.timestep / 1000.0
-            if broadcast_timer >= BROADCAST_INTERVAL:
-                broadcast_timer = 0.0
-                self._broadcast()
+            broadcast_ticks_left -= 1
+            if broadcast_ticks_left == 0:
+                broadcast_ticks_left = BROADCAST_EVERY_N
+                _bcast()
 
-            step_count += 1
+        self._stop_socket_server()
 
 
 #  Entry point 
+# SPEED_CAR_LOG=WARNING silences per-change messages in long runs
+logging.basicConfig(level=os.environ.get("SPEED_CAR_LOG", "INFO").upper(),
+                    format="%(message)s", stream=sys.stdout)
 controller = SpeedCarController()
 controller.run()
\ No newline at end of file
@@ -1,6 +1,8 @@
 import time
 from collections import deque
 
+MPS_TO_MPH = 2.236936
+
 class DecisionEngine:
     def __init__(self, confirm_frames: int, temporary_gap_mph: float,
                  overspeed_tolerance_mph: float, overspeed_hold_seconds: float,
@@ -20,7 +22,7 @@ class DecisionEngine:
 
     @staticmethod
     def mps_to_mph(v_mps: float) -> float:
-        return v_mps * 2.236936
+        return v_mps * MPS_TO_MPH
 
     def update(self, top_detected_mph: int | None, gps_speed_mps: float | None, map_speed_mph: int | None):
         """
@@ -34,7 +36,7 @@ class DecisionEngine:
         gps_mph = None
         moving = False
         if gps_speed_mps is not None:
-            gps_mph = self.mps_to_mph(gps_speed_mps)
+            gps_mph = gps_speed_mps * MPS_TO_MPH
             moving = gps_speed_mps >= self.gps_min_moving_mps
 
         # Update stable detection buffer
@@ -47,13 +49,14 @@ class DecisionEngine:
             return None
 
         # Confirm if last N detections are identical
-        if len(self._recent_speeds) < self.confirm_frames:
+        recent = self._recent_speeds
+        if len(recent) < self.confirm_frames:
             return None
 
-        if len(set(self._recent_speeds)) == 1:
-            confirmed = self._recent_speeds[-1]
-        else:
-            return None
+        confirmed = recent[-1]
+        for s in recent:
+            if s != confirmed:
+                return None
 
         self.current_sign_mph = confirmed
 
@@ -1,16 +1,57 @@
+import os
+
+import cv2
+import numpy as np
 from ultralytics import YOLO
 
+# Exported siblings of a .pt model, fastest first (see train_model.export_model)
+EXPORTED_SUFFIXES = (".engine", "_openvino_model", ".onnx")
+
 class YoloSpeedDetector:
-    def __init__(self, model_path: str, conf_th: float, iou_th: float, min_box_area: int, logger):
+    def __init__(self, model_path: str, conf_th: float, iou_th: float, min_box_area: int, logger,
+                 device: str | None = None, half: bool = False, prefer_exported: bool = True,
+                 infer_size: int | None = None):
+        # model_path may also be an exported model (OpenVINO dir, .onnx, .engine)
+        if prefer_exported:
+            model_path = self._find_exported(model_path, logger)
+        logger.info(f"YOLO model: {model_path}")
         self.model = YOLO(model_path)
         self.conf_th = conf_th
         self.iou_th = iou_th
         self.min_box_area = min_box_area
+        self.device = device
+        self.half = half
+        self.infer_size = infer_size
         self.logger = logger
 
         # model.names is dict: {id: "label"}
         self.names = self.model.names
 
+        # class id -> speed, fixed once the model is loaded (-1 = not a speed label)
+        self._speed_lut = np.full(max(self.names, default=-1) + 1, -1, dtype=np.int32)
+        for cls_id, label in self.names.items():
+            speed = self._label_to_speed(label)
+            if speed is not None:
+                self._speed_lut[cls_id] = speed
+
+    @staticmethod
+    def _find_exported(model_path: str, logger) -> str:
+        # weights/best.pt -> weights/best.engine, weights/best_openvino_model/, ...
+        stem, ext = os.path.splitext(model_path)
+        if ext != ".pt":
+            return model_path
+        pt_mtime = os.path.getmtime(model_path) if os.path.exists(model_path) else 0.0
+        for suffix in EXPORTED_SUFFIXES:
+            candidate = stem + suffix
+            if not os.path.exists(candidate):
+                continue
+            # A retrain overwrites the .pt but leaves old exports behind
+            if os.path.getmtime(candidate) < pt_mtime:
+                logger.warning(f"Ignoring stale export {candidate} (older than {model_path})")
+                continue
+            return candidate
+        return model_path
+
     def _label_to_speed(self, label: str):
         # Accept "20" or "speed_20"
         digits = "".join([c for c in label if c.isdigit()])
@@ -23,36 +64,56 @@ class YoloSpeedDetector:
 
     def detect(self, frame):
         """
-        Returns list of detections:
+        Returns list of detections (boxes in `frame` coordinates):
           [{'speed': int, 'conf': float, 'xyxy': (x1,y1,x2,y2)}]
         """
+        # Frames larger than the model input are shrunk once here (keeping
+        # aspect ratio) rather than moved at full size into Ultralytics
+        source, box_scale = frame, 1.0
+        if self.infer_size:
+            h, w = frame.shape[:2]
+            longest = max(h, w)
+            if longest > self.infer_size:
+                s = self.infer_size / longest
+                source = cv2.resize(frame, (round(w * s), round(h * s)),
+                                    interpolation=cv2.INTER_AREA)
+                box_scale = longest / self.infer_size
+
         results = self.model.predict(
-            source=frame,
+            source=source,
             conf=self.conf_th,
             iou=self.iou_th,
+            device=self.device,
+            half=self.half,
             verbose=False
         )
 
         dets = []
         r = results[0]
-        if r.boxes is None:
+        if r.boxes is None or len(r.boxes) == 0:
             return dets
 
-        for b in r.boxes:
-            conf = float(b.conf[0])
-            cls_id = int(b.cls[0])
-            label = self.names.get(cls_id, str(cls_id))
-            speed = self._label_to_speed(label)
-            if speed is None:
-                continue
+        # One device -> host transfer per tensor rather than per box
+        boxes = r.boxes
+        xyxy = boxes.xyxy
+        if box_scale != 1.0:
+            xyxy = xyxy * box_scale
+        xyxy = xyxy.int().cpu().numpy()   # cast on-device, copy int32
+        confs = boxes.conf.cpu().numpy()
+        cls_ids = boxes.cls.cpu().numpy().astype(np.int32)
 
-            x1, y1, x2, y2 = [int(v) for v in b.xyxy[0].tolist()]
-            area = max(0, x2 - x1) * max(0, y2 - y1)
-            if area < self.min_box_area:
-                continue
+        speeds = self._speed_lut[cls_ids]
+        widths = np.maximum(0, xyxy[:, 2] - xyxy[:, 0])
+        heights = np.maximum(0, xyxy[:, 3] - xyxy[:, 1])
+        keep = np.flatnonzero((speeds >= 0) & (widths * heights >= self.min_box_area))
 
+        # sort by confidence descending
+        keep = keep[np.argsort(-confs[keep], kind="stable")]
+
+        # One conversion per column for the kept rows, not one per box
+        for (x1, y1, x2, y2), speed, conf in zip(xyxy[keep].tolist(),
+                                                 speeds[keep].tolist(),
+                                                 confs[keep].tolist()):
             dets.append({"speed": speed, "conf": conf, "xyxy": (x1, y1, x2, y2)})
 
-        # sort by confidence descending
-        dets.sort(key=lambda d: d["conf"], reverse=True)
         return dets
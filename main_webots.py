@@ -2,22 +2,67 @@
 
 import argparse
 import time
+import concurrent.futures
+import selectors
 import socket
 import threading
 import json
+import logging
+import logging.handlers
 import os
+import queue
+import shutil
+import subprocess
 import sys
 import cv2
 import csv
+import numpy as np
 from datetime import datetime
 from typing import Optional
 
+try:
+    import orjson as fast_json      # parses bytes directly, 2–5× faster
+except ImportError:
+    fast_json = json
+
 
 sys.path.insert(0, os.path.dirname(__file__))
 from detector import YoloSpeedDetector
 from decision import DecisionEngine
 from config import Config
 
+log = logging.getLogger("main_webots")
+
+# Non-blocking key poll (OpenCV >= 4.5); older builds fall back to waitKey(1)
+poll_key = cv2.pollKey if hasattr(cv2, "pollKey") else (lambda: cv2.waitKey(1))
+
+
+def start_console_logging() -> logging.handlers.QueueListener:
+    """
+    Route `log` through a queue so the detection loop only enqueues
+    records; a listener thread does the (blocking) terminal writes.
+    """
+    log_queue = queue.SimpleQueue()
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, console)
+
+    log.addHandler(logging.handlers.QueueHandler(log_queue))
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    listener.start()
+    return listener
+
+
+class _StdLogger:
+    """Logger shim for the detector / decision engine, backed by `log`."""
+    __slots__ = ()
+
+    def info(self, m):    log.info("[INFO]  %s", m)
+    def debug(self, m):   log.debug("[DEBUG] %s", m)
+    def warning(self, m): log.warning("[WARN]  %s", m)
+    def error(self, m):   log.error("[ERROR] %s", m)
+
 
 
 # WEBOTS BRIDGE 
@@ -26,36 +71,42 @@ from config import Config
 class WebotsVehicleState:
    
     def __init__(self, fallback_speed_mph: float = 30.0):
-        self.speed_mps: float = fallback_speed_mph / 2.237
-        self.speed_mph: float = fallback_speed_mph
-        self.pos_x: float = 0.0
-        self.pos_z: float = 0.0
+        # Bridge-thread fields live in one immutable tuple, replaced by a
+        # single attribute store, so readers need no lock and never see a
+        # half-applied update: (speed_mps, speed_mph, pos_x, pos_z, connected)
+        self._state = (fallback_speed_mph / 2.237, fallback_speed_mph,
+                       0.0, 0.0, False)
+        # Written only by the main thread (M key)
         self.map_speed_mph: float = 30.0
-        self.connected: bool = False
-        self._lock = threading.Lock()
 
     def update_from_webots(self, data: dict):
-        with self._lock:
-            self.speed_mps = data.get("speed_mps", self.speed_mps)
-            self.speed_mph = data.get("speed_mph", self.speed_mph)
-            self.pos_x    = data.get("pos_x", self.pos_x)
-            self.pos_z    = data.get("pos_z", self.pos_z)
-            self.connected = True
+        speed_mps, speed_mph, pos_x, pos_z, _ = self._state
+        self._state = (data.get("speed_mps", speed_mps),
+                       data.get("speed_mph", speed_mph),
+                       data.get("pos_x", pos_x),
+                       data.get("pos_z", pos_z),
+                       True)
+
+    def set_disconnected(self):
+        self._state = self._state[:4] + (False,)
+
+    @property
+    def connected(self) -> bool:
+        return self._state[4]
 
     def get_speed_mps(self) -> float:
-        with self._lock:
-            return self.speed_mps
+        return self._state[0]
 
     def get_snapshot(self) -> dict:
-        with self._lock:
-            return {
-                "speed_mph": self.speed_mph,
-                "speed_mps": self.speed_mps,
-                "pos_x": self.pos_x,
-                "pos_z": self.pos_z,
-                "map_speed_mph": self.map_speed_mph,
-                "connected": self.connected
-            }
+        speed_mps, speed_mph, pos_x, pos_z, connected = self._state
+        return {
+            "speed_mph": speed_mph,
+            "speed_mps": speed_mps,
+            "pos_x": pos_x,
+            "pos_z": pos_z,
+            "map_speed_mph": self.map_speed_mph,
+            "connected": connected
+        }
 
 
 class WebotsBridge:
@@ -68,47 +119,103 @@ class WebotsBridge:
         self.port = port
         self.retry_interval = retry_interval
         self._running = True
+
+        # Persistent receive buffer; _rxlen bytes of a partial line are kept
+        # at the front between recv_into calls
+        self._rxbuf = bytearray(1 << 16)
+        self._rxmv  = memoryview(self._rxbuf)
+        self._rxlen = 0
+        self._skip_to_nl = False   # inside a line that overflowed _rxbuf
+
+        # stop() writes to _wake_w so the selector returns immediately
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+
         self._thread = threading.Thread(target=self._listen, daemon=True)
         self._thread.start()
 
     def _listen(self):
+        sel = selectors.DefaultSelector()
+        sel.register(self._wake_r, selectors.EVENT_READ)
+
         while self._running:
+            sock = None
             try:
                 print(f"[Bridge] Connecting to Webots on {self.host}:{self.port}...")
                 sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
                 sock.settimeout(5.0)
                 sock.connect((self.host, self.port))
-                sock.settimeout(2.0)
+                sock.setblocking(False)
+                sel.register(sock, selectors.EVENT_READ)
                 print("[Bridge]  Connected to Webots controller!")
 
-                buf = ""
+                self._rxlen = 0
+                self._skip_to_nl = False
                 while self._running:
+                    # Block until telemetry arrives or stop() wakes us
+                    sel.select()
+                    if not self._running:
+                        break
+
+                    if self._rxlen == len(self._rxbuf):
+                        # Drop the whole line, including the part not yet read
+                        print("[Bridge] Oversized message — discarded")
+                        self._rxlen = 0
+                        self._skip_to_nl = True
                     try:
-                        chunk = sock.recv(1024).decode()
-                        if not chunk:
-                            break
-                        buf += chunk
-                        while "\n" in buf:
-                            line, buf = buf.split("\n", 1)
-                            line = line.strip()
-                            if line:
-                                data = json.loads(line)
-                                self.vehicle.update_from_webots(data)
-                    except socket.timeout:
-                        pass
-                sock.close()
+                        n = sock.recv_into(self._rxmv[self._rxlen:])
+                    except BlockingIOError:
+                        continue
+                    if n == 0:
+                        break
+                    end = self._rxlen + n
+
+                    # Parse each complete line; keep the partial tail
+                    start = 0
+                    if self._skip_to_nl:
+                        nl = self._rxbuf.find(b"\n", 0, end)
+                        if nl == -1:
+                            self._rxlen = 0     # still inside the oversized line
+                            continue
+                        start = nl + 1
+                        self._skip_to_nl = False
+                    nl = self._rxbuf.find(b"\n", start, end)
+                    while nl != -1:
+                        line = bytes(self._rxmv[start:nl]).strip()
+                        if line:
+                            data = fast_json.loads(line)
+                            self.vehicle.update_from_webots(data)
+                        start = nl + 1
+                        nl = self._rxbuf.find(b"\n", start, end)
+
+                    self._rxlen = end - start
+                    if start and self._rxlen:
+                        self._rxbuf[:self._rxlen] = self._rxbuf[start:end]
             except (ConnectionRefusedError, OSError):
                 print(f"[Bridge] Webots not reachable — retrying in "
                       f"{self.retry_interval}s (using fallback speed)")
-                self.vehicle.connected = False
-                time.sleep(self.retry_interval)
+                self.vehicle.set_disconnected()
+                sel.select(timeout=self.retry_interval)   # returns early on stop()
             except Exception as e:
                 print(f"[Bridge] Error: {e} — reconnecting...")
-                self.vehicle.connected = False
-                time.sleep(self.retry_interval)
+                self.vehicle.set_disconnected()
+                sel.select(timeout=self.retry_interval)
+            finally:
+                if sock is not None:
+                    try:
+                        sel.unregister(sock)
+                    except KeyError:   # connect never succeeded
+                        pass
+                    sock.close()
+
+        sel.close()
 
     def stop(self):
         self._running = False
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
 
 
 
@@ -122,9 +229,28 @@ class Buzzer:
     - Designed to signal TEMPORARY sign detection 
     """
 
+    # Candidate players per platform, tried in order (argv, no shell)
+    _PLAYERS = {
+        "darwin": (("afplay", "/System/Library/Sounds/Funk.aiff"),),
+        "linux":  (("paplay", "/usr/share/sounds/freedesktop/stereo/bell.oga"),
+                   ("aplay", "-q", "/usr/share/sounds/alsa/Front_Center.wav")),
+    }
+
     def __init__(self, cooldown_seconds: float = 5.0):
-        self.cooldown = cooldown_seconds
+        self.cooldown   = cooldown_seconds
         self._last_buzz = 0.0
+        self._players   = self._find_players()  # resolved once, not per buzz
+        # One worker so a 500 ms winsound.Beep never stalls the detection
+        # loop; _pending keeps at most one sound queued
+        self._exec      = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="buzzer")
+        self._pending   = False
+
+    def _find_players(self):
+        """Installed players whose sound file exists, in preference order."""
+        key = "linux" if sys.platform.startswith("linux") else sys.platform
+        return [list(argv) for argv in self._PLAYERS.get(key, ())
+                if shutil.which(argv[0]) and os.path.exists(argv[-1])]
 
     def buzz(self, reason: str = "TEMPORARY SIGN"):
         """Trigger a buzzer alert with cooldown."""
@@ -133,35 +259,45 @@ class Buzzer:
             return   # still cooling down
 
         self._last_buzz = now
-        self._play_sound(reason)
+        if not self._pending:
+            self._pending = True
+            self._exec.submit(self._play_sound, reason)
         self._print_alert(reason)
 
+    def close(self):
+        self._exec.shutdown(wait=False)
+
     def _print_alert(self, reason: str):
         ts = datetime.now().strftime("%H:%M:%S")
-        print("\n" + "\033[93m" + "=" * 60)
-        print(f"  🔔 BUZZER  [{ts}]")
-        print(f"  {reason}")
-        print("=" * 60 + "\033[0m\n")
+        log.info("\n\033[93m%s\n  🔔 BUZZER  [%s]\n  %s\n%s\033[0m\n",
+                 "=" * 60, ts, reason, "=" * 60)
 
     def _play_sound(self, reason: str):
-        """Best-effort audio alert."""
+        """Best-effort audio alert (runs on the buzzer worker)."""
         try:
-            if sys.platform == "darwin":          # macOS
-                os.system("afplay /System/Library/Sounds/Funk.aiff &")
-            elif sys.platform.startswith("linux"):
-                # Try paplay, then aplay, then terminal bell
-                r = os.system("paplay /usr/share/sounds/freedesktop/stereo/bell.oga "
-                               ">/dev/null 2>&1")
-                if r != 0:
-                    os.system("aplay /usr/share/sounds/alsa/Front_Center.wav "
-                              ">/dev/null 2>&1 || echo -e '\\a'")
-            elif sys.platform == "win32":
+            if sys.platform == "win32":
                 import winsound
                 # 880 Hz for 500ms — like a real buzzer
                 winsound.Beep(880, 500)
+                return
+            # Spawn directly (no shell); waiting here only blocks the buzzer
+            # worker. A player that fails (e.g. paplay with no sound server
+            # running) falls through to the next one, then to the bell.
+            for argv in self._players:
+                try:
+                    if subprocess.run(argv, stdin=subprocess.DEVNULL,
+                                      stdout=subprocess.DEVNULL,
+                                      stderr=subprocess.DEVNULL,
+                                      timeout=5).returncode == 0:
+                        return
+                except (OSError, subprocess.SubprocessError):
+                    pass
+            print("\a", end="", flush=True)
         except Exception:
             # Last resort: terminal bell
             print("\a", end="", flush=True)
+        finally:
+            self._pending = False
 
 
 
@@ -174,6 +310,23 @@ class AlertManager:
     Triggers the Buzzer on TEMPORARY sign events.
     """
 
+    _COLORS = {
+        "OVERSPEED": "\033[91m",
+        "TEMPORARY": "\033[93m",
+        "INFO":      "\033[92m",
+        "WARNING":   "\033[95m",
+    }
+    _SYMBOLS = {
+        "OVERSPEED": "🚨 OVERSPEED!",
+        "TEMPORARY": "⚠️  TEMPORARY SIGN",
+        "INFO":      "✓  INFO",
+        "WARNING":   "⚠️  WARNING",
+    }
+    _BAR    = "=" * 60
+    _RESET  = "\033[0m"
+    # Whole banner as one template → one record, one terminal write
+    _BANNER = "\n%s" + _BAR + "\n[%s] %s\n%s\n" + _BAR + _RESET + "\n"
+
     def __init__(self, buzzer: Buzzer,
                  cooldown_seconds: float = 5.0):
         self.buzzer = buzzer
@@ -188,27 +341,14 @@ class AlertManager:
             return
         self._last_alert[alert_type] = now
 
-        colors = {
-            "OVERSPEED": "\033[91m",
-            "TEMPORARY": "\033[93m",
-            "INFO":      "\033[92m",
-            "WARNING":   "\033[95m",
-        }
-        symbols = {
-            "OVERSPEED": "🚨 OVERSPEED!",
-            "TEMPORARY": "⚠️  TEMPORARY SIGN",
-            "INFO":      "✓  INFO",
-            "WARNING":   "⚠️  WARNING",
-        }
-        color  = colors.get(alert_type, "")
-        symbol = symbols.get(alert_type, "")
-        reset  = "\033[0m"
-        ts     = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        color  = self._COLORS.get(alert_type, "")
+        symbol = self._SYMBOLS.get(alert_type, "")
+        # HH:MM:SS.mmm local time without strftime's format parsing
+        lt     = time.localtime(now)
+        ts     = (f"{lt.tm_hour:02d}:{lt.tm_min:02d}:{lt.tm_sec:02d}"
+                  f".{int(now * 1000) % 1000:03d}")
 
-        print(f"\n{color}{'='*60}")
-        print(f"[{ts}] {symbol}")
-        print(message)
-        print(f"{'='*60}{reset}\n")
+        log.info(self._BANNER, color, ts, symbol, message)
 
         #  BUZZER for temporary sign
         if alert_type == "TEMPORARY":
@@ -226,38 +366,55 @@ class AlertManager:
 
 
 class DataLogger:
+    FIELDS = ("timestamp", "vehicle_speed_mph", "map_speed_mph",
+              "pos_x", "pos_z", "webots_connected", "detected_speed",
+              "confirmed_speed", "confidence", "is_overspeed", "is_temporary")
+
     def __init__(self, filename: str = "detection_log_webots.csv"):
         self.filename = filename
-        self.data = []
-        self.start_time = time.time()
+        self.rows = 0
+        self.start_time = time.monotonic()
+
+        # Rows are streamed to disk as they arrive (constant memory). The
+        # file is only opened on the first row, so a session that logs
+        # nothing leaves the previous CSV untouched.
+        self._f = None
+        self._w = None
+
+    def _open(self):
+        self._f = open(self.filename, "w", newline="", buffering=1 << 16)
+        self._w = csv.writer(self._f)
+        self._w.writerow(self.FIELDS)
 
     def log(self, snap: dict, detected_speed: Optional[int],
             confirmed_speed: Optional[int], confidence: float,
             is_overspeed: bool, is_temporary: bool):
-        self.data.append({
-            "timestamp":       round(time.time() - self.start_time, 3),
-            "vehicle_speed_mph": snap["speed_mph"],
-            "map_speed_mph":     snap["map_speed_mph"],
-            "pos_x":             snap["pos_x"],
-            "pos_z":             snap["pos_z"],
-            "webots_connected":  int(snap["connected"]),
-            "detected_speed":    detected_speed or 0,
-            "confirmed_speed":   confirmed_speed or 0,
-            "confidence":        round(confidence, 3),
-            "is_overspeed":      int(is_overspeed),
-            "is_temporary":      int(is_temporary),
-        })
+        if self._w is None:
+            self._open()
+        self._w.writerow((
+            round(time.monotonic() - self.start_time, 3),
+            snap["speed_mph"],
+            snap["map_speed_mph"],
+            snap["pos_x"],
+            snap["pos_z"],
+            int(snap["connected"]),
+            detected_speed or 0,
+            confirmed_speed or 0,
+            round(confidence, 3),
+            int(is_overspeed),
+            int(is_temporary),
+        ))
+        self.rows += 1
 
     def save(self):
-        if not self.data:
-            print("No data to save.")
+        if self._f is None:
+            print(f"No data logged — {self.filename} left unchanged.")
             return
-        with open(self.filename, "w", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=self.data[0].keys())
-            writer.writeheader()
-            writer.writerows(self.data)
+        if self._f.closed:
+            return
+        self._f.close()
         print(f"\n📊 Data saved to: {self.filename}  "
-              f"({len(self.data)} frames)")
+              f"({self.rows} frames)")
 
 
 
@@ -280,6 +437,8 @@ class WebotsDetectionSystem:
 
         self.config     = Config()
         self.show_video = show_video
+        self._log_listener = start_console_logging()
+        self._std_logger   = _StdLogger()
 
         # [1] Camera
         print(f"\n[1/6] Opening camera {camera_index}...")
@@ -299,7 +458,11 @@ class WebotsDetectionSystem:
             conf_th       = self.config.conf_threshold,
             iou_th        = self.config.iou_threshold,
             min_box_area  = self.config.min_box_area,
-            logger        = self._logger()
+            logger        = self._std_logger,
+            device        = self.config.yolo_device,
+            half          = self.config.yolo_half,
+            prefer_exported = self.config.yolo_prefer_exported,
+            infer_size    = self.config.infer_size
         )
         print("   YOLO ready")
 
@@ -311,7 +474,7 @@ class WebotsDetectionSystem:
             overspeed_tolerance_mph= self.config.overspeed_tolerance_mph,
             overspeed_hold_seconds = self.config.overspeed_hold_seconds,
             gps_min_moving_mps     = self.config.gps_min_moving_mps,
-            logger                 = self._logger()
+            logger                 = self._std_logger
         )
         print("   Decision engine ready")
 
@@ -338,6 +501,22 @@ class WebotsDetectionSystem:
         self.frame_count   = 0
         self.last_status_t = 0.0
 
+        # Capture runs in its own thread so camera I/O overlaps YOLO.
+        # It publishes (seq, frame) into a single latest-wins slot with one
+        # attribute store (atomic under the GIL); older frames are dropped.
+        self._latest       = None
+        self._stop_capture = threading.Event()
+        self._capture_thread = threading.Thread(target=self._capture_loop,
+                                                daemon=True)
+
+        # Static-scene gate for YOLO (see _detect_if_changed)
+        self._det_thumb           = None
+        self._last_dets           = None
+        self._frames_since_detect = 0
+
+        # Prerendered overlay text (see _put_cached_text)
+        self._text_masks = {}
+
         # Manual override (press T to toggle)
         self.manual_override        = False
         self.manual_override_speed  = fallback_speed_mph
@@ -350,14 +529,6 @@ class WebotsDetectionSystem:
         self._print_controls()
 
     
-    def _logger(self):
-        class L:
-            def info(s, m):    print(f"[INFO]  {m}")
-            def debug(s, m):   pass
-            def warning(s, m): print(f"[WARN]  {m}")
-            def error(s, m):   print(f"[ERROR] {m}")
-        return L()
-
     def _print_controls(self):
         print("\nControls (click the OpenCV window first):")
         print("  M       → cycle map speed limit")
@@ -380,8 +551,8 @@ class WebotsDetectionSystem:
             speed_mps = snap["speed_mps"]
             map_mph   = snap["map_speed_mph"]
 
-        # 1. YOLO on real webcam frame
-        detections = self.detector.detect(frame)
+        # 1. YOLO on real webcam frame (skipped while the scene is static)
+        detections = self._detect_if_changed(frame)
         top        = detections[0] if detections else None
         top_speed  = top["speed"] if top else None
         top_conf   = top["conf"]  if top else 0.0
@@ -427,6 +598,24 @@ class WebotsDetectionSystem:
 
         return frame, top_speed, confirmed, top_conf, is_overspeed, is_temporary
 
+    def _detect_if_changed(self, frame):
+        thumb = cv2.cvtColor(cv2.resize(frame, (64, 36),
+                                        interpolation=cv2.INTER_AREA),
+                             cv2.COLOR_BGR2GRAY)
+
+        if (self._last_dets is not None
+                and self._frames_since_detect < self.config.motion_refresh_frames
+                and cv2.absdiff(thumb, self._det_thumb).mean()
+                    < self.config.motion_skip_threshold):
+            self._frames_since_detect += 1
+            return self._last_dets
+
+        detections = self.detector.detect(frame)
+        self._det_thumb           = thumb
+        self._last_dets           = detections
+        self._frames_since_detect = 0
+        return detections
+
    
     def _draw_overlay(self, frame, detection, snap,
                       confirmed, is_overspeed, is_temporary):
@@ -444,8 +633,8 @@ class WebotsDetectionSystem:
 
         h, w = frame.shape[:2]
 
-        # Dark header bar
-        cv2.rectangle(frame, (0, 0), (w, 90), (30, 30, 30), -1)
+        # Dark header bar (rows 0–90 inclusive, clipped like cv2.rectangle)
+        frame[:91] = (30, 30, 30)
 
         # Line 1 — vehicle speed
         speed_val  = self.manual_override_speed if self.manual_override \
@@ -465,11 +654,9 @@ class WebotsDetectionSystem:
                         + (" [TEMP]" if is_temporary else ""),
                         (10, 58), cv2.FONT_HERSHEY_SIMPLEX, 0.75, lim_color, 2)
 
-        # Map speed (right side)
-        cv2.putText(frame,
-                    f"Map: {snap['map_speed_mph']:.0f} mph",
-                    (w - 210, 28), cv2.FONT_HERSHEY_SIMPLEX, 0.7,
-                    (180, 180, 180), 2)
+        # Map speed (right side), drawn after lines 1/2 as before
+        self._put_cached_text(frame, f"Map: {snap['map_speed_mph']:.0f} mph",
+                              (w - 210, 28), 0.7, (180, 180, 180), 2)
 
         # Webots connection indicator
         dot_color = (0, 255, 0) if snap["connected"] else (0, 100, 255)
@@ -492,12 +679,39 @@ class WebotsDetectionSystem:
                         0.7, (255, 255, 255), 2)
 
         # Controls reminder
-        cv2.putText(frame, "M=map  T=override  W/S=speed  Q=quit",
-                    (10, h - (55 if is_overspeed or is_temporary else 10)),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.45, (120, 120, 120), 1)
+        self._put_cached_text(frame, "M=map  T=override  W/S=speed  Q=quit",
+                              (10, h - (55 if is_overspeed or is_temporary else 10)),
+                              0.45, (120, 120, 120), 1)
 
         return frame
 
+    def _put_cached_text(self, frame, text: str, org, scale: float,
+                         color, thickness: int):
+        """
+        cv2.putText with the glyphs rendered once into a boolean mask and
+        painted with a masked assignment. Same pixels as putText (LINE_8);
+        text that would be clipped by the frame edge is drawn normally.
+        """
+        key = (text, scale, thickness)
+        layer = self._text_masks.get(key)
+        if layer is None:
+            m = 4   # margin wider than the stroke
+            (tw, th), base = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX,
+                                             scale, thickness)
+            strip = np.zeros((th + base + 2 * m, tw + 2 * m), dtype=np.uint8)
+            cv2.putText(strip, text, (m, th + m), cv2.FONT_HERSHEY_SIMPLEX,
+                        scale, 255, thickness)
+            layer = self._text_masks[key] = (strip > 0, m, th + m)
+
+        mask, left, ascent = layer
+        x0, y0 = org[0] - left, org[1] - ascent
+        h, w = frame.shape[:2]
+        if x0 < 0 or y0 < 0 or x0 + mask.shape[1] > w or y0 + mask.shape[0] > h:
+            cv2.putText(frame, text, org, cv2.FONT_HERSHEY_SIMPLEX,
+                        scale, color, thickness)
+            return
+        frame[y0:y0 + mask.shape[0], x0:x0 + mask.shape[1]][mask] = color
+
    
     # KEYBOARD HANDLING (OpenCV)
    
@@ -533,18 +747,35 @@ class WebotsDetectionSystem:
         return True
 
    
+    # CAMERA CAPTURE THREAD
+   
+    def _capture_loop(self):
+        seq = 0
+        while not self._stop_capture.is_set():
+            ret, frame = self.camera.read()
+            if not ret:
+                print("[WARNING] Camera read failed — skipping frame")
+                continue
+
+            seq += 1
+            self._latest = (seq, frame)
+
+   
     # MAIN LOOP
    
     def run(self):
         print("\nStarting detection loop…")
         print("Hold printed speed signs in front of the webcam!\n")
 
+        self._capture_thread.start()
+        last_seq = 0
         try:
             while self.running:
-                ret, frame = self.camera.read()
-                if not ret:
-                    print("[WARNING] Camera read failed — skipping frame")
+                latest = self._latest
+                if latest is None or latest[0] == last_seq:
+                    time.sleep(0.001)   # no new frame yet
                     continue
+                last_seq, frame = latest
 
                 self.frame_count += 1
                 frame, det, conf_spd, conf, is_over, is_temp = \
@@ -552,12 +783,15 @@ class WebotsDetectionSystem:
 
                 if self.show_video:
                     cv2.imshow("Speed Detection — Webots Integration", frame)
-                    key = cv2.waitKey(1) & 0xFF
-                    if not self._handle_key(key):
+                    key = poll_key()
+                    if key != -1 and not self._handle_key(key & 0xFF):
                         break
 
-                # Periodic console status (1 Hz)
-                now = time.time()
+                # Periodic console status (1 Hz); only read the clock
+                # every 8th frame
+                if self.frame_count & 7:
+                    continue
+                now = time.monotonic()
                 if now - self.last_status_t > 1.0:
                     self.last_status_t = now
                     snap = self.vehicle.get_snapshot()
@@ -565,12 +799,12 @@ class WebotsDetectionSystem:
                     spd  = (self.manual_override_speed if self.manual_override
                             else snap["speed_mph"])
                     src  = "MANUAL" if self.manual_override else f"Webots{wbt}"
-                    print(f"[{self.frame_count:>5}] "
-                          f"Speed: {spd:.0f} mph [{src}]  |  "
-                          f"Detected: {det or '--'}  |  "
-                          f"Confirmed: {conf_spd or '--'}  |  "
-                          f"Map: {snap['map_speed_mph']:.0f} mph  |  "
-                          f"Temp: {is_temp}  Overspeed: {is_over}")
+                    log.info("[%5d] Speed: %.0f mph [%s]  |  Detected: %s  |  "
+                             "Confirmed: %s  |  Map: %.0f mph  |  "
+                             "Temp: %s  Overspeed: %s",
+                             self.frame_count, spd, src, det or '--',
+                             conf_spd or '--', snap['map_speed_mph'],
+                             is_temp, is_over)
 
         except KeyboardInterrupt:
             print("\nInterrupted.")
@@ -579,10 +813,16 @@ class WebotsDetectionSystem:
 
     def cleanup(self):
         print("\nShutting down…")
+        self.running = False
+        self._stop_capture.set()
+        if self._capture_thread.is_alive():
+            self._capture_thread.join(timeout=2.0)
         self.bridge.stop()
+        self.buzzer.close()
         self.data_logger.save()
         self.camera.release()
         cv2.destroyAllWindows()
+        self._log_listener.stop()   # flush queued alerts before the summary
 
         print("\n" + "=" * 60)
         print("SESSION SUMMARY")